@@ -11,6 +11,18 @@ DEFAULT_COUNTRY = 'gb'
 # Maximum response body length to log
 MAX_RESPONSE_BODY_LENGTH = 500
 
+# Maximum number of concurrent requests to the API
+CONCURRENCY = 32
+
+# Retries for transient request failures, with exponential backoff
+MAX_RETRIES = 5
+RETRY_BACKOFF_FACTOR = 0.3
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+# Read buffer size and number of rows read at a time from the CSV file
+CSV_BUFFER_SIZE = 4 * 1024 * 1024
+CSV_BATCH_SIZE = 10000
+
 # Retrieve the SECRET_KEY from the environment variable
 SECRET_KEY = os.environ.get('SECRET_KEY')
 
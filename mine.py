@@ -1,14 +1,27 @@
 import argparse
+import asyncio
+import atexit
 import base64
+import codecs
 import concurrent.futures
 import csv
+import io
+import itertools
 import logging
-import os
+import logging.handlers
+import queue
+import sys
 import time
-from typing import Any, Dict
+from collections import Counter, namedtuple
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
 
+import httpx
+import orjson
 from requests import Session
 from requests import exceptions as requests_exceptions
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import config
 
@@ -17,18 +30,40 @@ import config
 # =============================================================================
 log_format = '%(asctime)s - %(levelname)s - %(message)s'
 hr = '=' * 77
-logging.basicConfig(level=logging.INFO, format=log_format)
 
-# Create a file handler for logging to a text file
-file_handler = logging.FileHandler('job_posts.log')
-file_handler.setLevel(logging.INFO)
-file_formatter = logging.Formatter(f'{log_format}\n{hr}')
-file_handler.setFormatter(file_formatter)
-logging.getLogger().addHandler(file_handler)
+def setup_logging() -> None:
+    """Sends log records to the console and the log file through a queue."""
+    # Every record is followed by a horizontal rule for readability
+    formatter = logging.Formatter(f'{log_format}\n{hr}')
 
-def log_with_hr(logger_function, message: str):
-    """Logs a message followed by a horizontal rule using a specified logger function."""
-    logger_function(f"{message}\n{hr}")
+    # Create a stream handler for logging to the console
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    # Create a file handler for logging to a text file
+    file_handler = logging.FileHandler('job_posts.log', encoding='utf-8')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+
+    # Worker threads format each record and put it on a queue; a single
+    # listener thread writes them out, keeping console and file I/O off the
+    # request path
+    log_queue: queue.Queue = queue.Queue(-1)
+    logging.getLogger().setLevel(logging.INFO)
+    # httpx logs every request at INFO; the outcome is already logged here
+    for name in ('httpx', 'httpcore'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler)
+    log_listener.start()
+
+    # Write out any records still queued on exit
+    atexit.register(log_listener.stop)
+
+# Only attach handlers once, even if this module is imported more than once
+# (e.g. both as __main__ and as mine)
+if not logging.getLogger().handlers:
+    setup_logging()
 
 # =============================================================================
 # Configuration
@@ -37,59 +72,307 @@ url = config.API_URL  # API URL from the config module
 default_category = config.DEFAULT_CATEGORY  # Default category
 default_country = config.DEFAULT_COUNTRY    # Default country
 max_response_body_length = config.MAX_RESPONSE_BODY_LENGTH  # Max length of response body to log
+secret_key_from_env = config.SECRET_KEY  # SECRET_KEY environment variable, if set
+default_concurrency = config.CONCURRENCY  # Default number of concurrent requests
+csv_buffer_size = config.CSV_BUFFER_SIZE  # Read buffer size for the CSV file
+csv_batch_size = config.CSV_BATCH_SIZE  # Number of CSV rows read per batch
+max_retries = config.MAX_RETRIES  # Retries for transient request failures
+retry_backoff_factor = config.RETRY_BACKOFF_FACTOR  # Base delay between retries
+retry_status_codes = config.RETRY_STATUS_CODES  # Response statuses worth retrying
+
+# =============================================================================
+# HTTP Session
+# =============================================================================
+# A single Session is shared by every worker thread so that connections (and
+# their TLS handshakes) are reused across job posts instead of being
+# re-established for each row.
+SESSION = Session()
+SESSION.headers.update({'Content-Type': 'application/json'})
+
+def configure_session(pool_size: int) -> None:
+    """Sizes the shared Session's connection pool to match the number of workers."""
+    # Transient failures are retried inside urllib3 with exponential backoff.
+    # Once retries run out the last response is returned, so it is logged by
+    # status code like any other HTTP error.
+    retry = Retry(total=max_retries, backoff_factor=retry_backoff_factor,
+                  status_forcelist=retry_status_codes,
+                  allowed_methods=frozenset(['POST']),
+                  respect_retry_after_header=True, raise_on_status=False)
+    SESSION.mount('https://', HTTPAdapter(pool_maxsize=pool_size, max_retries=retry))
+
+# Size of the chunks response bodies are streamed in
+RESPONSE_CHUNK_SIZE = 8192
+
+# Longest wait between retries, in seconds (urllib3's default cap)
+RETRY_BACKOFF_MAX = 120
+
+# Values shared by every request in a run, built once and passed to each
+# worker: the API URL, Authorization header, payload fields other than the
+# job post itself, and the number of response body bytes to log
+RequestContext = namedtuple('RequestContext', 'url auth payload_tpl max_log_bytes')
 
 # =============================================================================
 # Utility Functions
 # =============================================================================
 
+@lru_cache(maxsize=4)
 def encode_base64(string: str) -> str:
-    base64_bytes = base64.b64encode(string.encode('utf-8'))
-    base64_string = base64_bytes.decode('utf-8')
-    return base64_string
-
-def make_curl_request(job_post_id: str, job_url: str, category: str,
-                      country: str, secret_key: str) -> None:
-    data: Dict[str, Any] = {
-        "jobPostId": job_post_id,
-        "url": job_url,
-        "category": category,
-        "country": country
-    }
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Basic {encode_base64(secret_key + ":")}'
-    }
-
-    with Session() as session:
-        try:
-            response = session.post(url, headers=headers, json=data)
+    return base64.b64encode(string.encode('ascii')).decode('ascii')
+
+def log_response(job_post_id: str, status_code: int, body_head: bytearray,
+                 max_length: int) -> None:
+    """Logs a successful response, truncating the body to max_length bytes."""
+    if not logging.getLogger().isEnabledFor(logging.INFO):
+        return
+    response_body = str(memoryview(body_head)[:max_length], 'utf-8', 'replace') + (
+        '...' if len(body_head) > max_length else '')
+    logging.info("Request successful for job post ID: %s\nStatus Code: %s\nResponse Body: %s",
+                 job_post_id, status_code, response_body)
+
+def log_http_error(job_post_id: str, status_code: int, error: Exception) -> None:
+    """Logs a non-2xx response from the API."""
+    if status_code == 401:
+        logging.error("Unauthorized access for job mining: %s. Error: %s",
+                      job_post_id, error)
+    elif status_code == 404:
+        logging.error("Not found for job post ID: %s. Error: %s",
+                      job_post_id, error)
+    else:
+        logging.error("HTTP error for job post ID: %s. Status Code: %s. Error: %s",
+                      job_post_id, status_code, error)
+
+def log_request_failure(job_post_id: str, error: Exception) -> None:
+    """Logs a request that failed before a response was received."""
+    logging.error("Request failed for job post ID: %s. Error: %s",
+                  job_post_id, error)
+
+def log_unexpected_error(job_post_id: str, error: BaseException) -> None:
+    """Logs an exception that escaped a request worker."""
+    logging.error("Exception occurred for job post ID: %s. Error: %s",
+                  job_post_id, error)
+
+# =============================================================================
+# CSV Reading
+# =============================================================================
+
+def open_csv(path: str) -> io.TextIOWrapper:
+    """Opens a CSV file through a large read buffer, skipping any UTF-8 BOM."""
+    raw = open(path, mode='rb', buffering=csv_buffer_size)
+    if raw.peek(len(codecs.BOM_UTF8)).startswith(codecs.BOM_UTF8):
+        raw.read(len(codecs.BOM_UTF8))
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+def dedup_key(job_post_id: str) -> Union[int, str]:
+    """Returns a compact key for deduplicating a job post ID.
+
+    Plain numeric IDs of up to 18 digits are kept as ints, which take about
+    half the memory of the equivalent str. Longer IDs, and IDs with leading
+    zeros or other characters, are kept as they are, so distinct IDs never
+    share a key.
+    """
+    if len(job_post_id) <= 18 and job_post_id.isascii() and job_post_id.isdigit() and (
+            job_post_id[0] != '0' or job_post_id == '0'):
+        return int(job_post_id)
+    return job_post_id
+
+def iter_job_post_batches(reader: Iterator[list], id_index: int, url_index: int,
+                          stats: Counter) -> Iterator[Dict[str, str]]:
+    """Yields job posts not seen in earlier rows, mapping ID to URL, one batch of rows at a time."""
+    min_row_length = max(id_index, url_index) + 1
+    seen = set()  # dedup_key() of every job post ID yielded so far
+
+    while True:
+        rows = list(itertools.islice(reader, csv_batch_size))
+        if not rows:
+            return
+
+        # Dedupe the whole batch before handing it over, keeping the first
+        # URL seen for each job post ID
+        job_posts: Dict[str, str] = {}
+        for row in rows:
+            if len(row) < min_row_length:
+                if row:
+                    logging.warning("Skipping CSV row: missing 'jobPostId' or 'url': %s", row)
+                    stats['malformed'] += 1
+                continue
+            stats['rows'] += 1
+            job_post_id = row[id_index]
+            key = dedup_key(job_post_id)
+            if key not in seen:
+                seen.add(key)
+                job_url = row[url_index]
+                job_posts[job_post_id] = job_url
+                stats['unique'] += 1
+                if not job_post_id.strip():
+                    stats['empty_ids'] += 1
+                if not job_url.strip():
+                    stats['empty_urls'] += 1
+        yield job_posts
+
+# =============================================================================
+# Request Functions
+# =============================================================================
+
+def retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    """Returns how long to wait before a retry, honouring a Retry-After header given in seconds.
+
+    Matches urllib3's Retry backoff: the first retry is immediate, then the
+    delay doubles from 2 x the backoff factor, up to RETRY_BACKOFF_MAX.
+    """
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    if attempt == 0:
+        return 0.0
+    return min(RETRY_BACKOFF_MAX, retry_backoff_factor * (2 ** attempt))
+
+def append_body_head(body_head: bytearray, chunk: bytes, max_length: int) -> None:
+    """Appends as much of a response body chunk as will be logged.
+
+    One byte past max_length is kept so that truncation can be detected.
+    """
+    remaining = max_length + 1 - len(body_head)
+    if remaining > 0:
+        body_head += memoryview(chunk)[:remaining]
+
+def read_body_head(chunks: Iterable[bytes], max_length: int) -> bytearray:
+    """Reads a streamed response body, keeping only as much as will be logged.
+
+    The rest of the body is still drained so the connection can be reused.
+    """
+    body_head = bytearray()
+    for chunk in chunks:
+        append_body_head(body_head, chunk, max_length)
+    return body_head
+
+def make_curl_request(ctx: RequestContext, job_post_id: str, job_url: str) -> None:
+    data: Dict[str, Any] = {"jobPostId": job_post_id, "url": job_url, **ctx.payload_tpl}
+
+    try:
+        with SESSION.post(ctx.url, headers={'Authorization': ctx.auth},
+                          data=orjson.dumps(data), stream=True) as response:
+            body_head = read_body_head(response.iter_content(RESPONSE_CHUNK_SIZE),
+                                       ctx.max_log_bytes)
             response.raise_for_status()
+            log_response(job_post_id, response.status_code, body_head, ctx.max_log_bytes)
+    except requests_exceptions.HTTPError as e:
+        log_http_error(job_post_id, response.status_code, e)
+    except requests_exceptions.RequestException as e:
+        log_request_failure(job_post_id, e)
 
-            response_body = response.text[:max_response_body_length] + (
-                '...' if len(response.text) > max_response_body_length else '')
-            log_message = (f"Request successful for job post ID: {job_post_id}\n"
-                           f"Status Code: {response.status_code}\n"
-                           f"Response Body: {response_body}")
-            log_with_hr(logging.info, log_message)
-            print(f"{log_message}\n{hr}")
-        except requests_exceptions.HTTPError as e:
-            if response.status_code == 401:
-                log_message = f"Unauthorized access for job mining: {job_post_id}. Error: {e}"
-            elif response.status_code == 404:
-                log_message = f"Not found for job post ID: {job_post_id}. Error: {e}"
-            else:
-                log_message = f"HTTP error for job post ID: {job_post_id}. Status Code: {response.status_code}. Error: {e}"
-            log_with_hr(logging.error, log_message)
-            print(f"ERROR - {log_message}\n{hr}")
-        except requests_exceptions.RequestException as e:
-            log_message = f"Request failed for job post ID: {job_post_id}. Error: {e}"
-            log_with_hr(logging.error, log_message)
-            print(f"ERROR - {log_message}\n{hr}")
+async def post_one(client: httpx.AsyncClient, sem: asyncio.Semaphore,
+                   ctx: RequestContext, job_post_id: str, job_url: str) -> None:
+    data: Dict[str, Any] = {"jobPostId": job_post_id, "url": job_url, **ctx.payload_tpl}
+
+    # Follows the requests Session's retry policy and backoff schedule
+    async with sem:
+        for attempt in range(max_retries + 1):
+            retry_after = None
+            try:
+                async with client.stream('POST', ctx.url, headers={'Authorization': ctx.auth},
+                                         content=orjson.dumps(data)) as response:
+                    body_head = bytearray()
+                    async for chunk in response.aiter_bytes(RESPONSE_CHUNK_SIZE):
+                        append_body_head(body_head, chunk, ctx.max_log_bytes)
+                    if response.status_code in retry_status_codes and attempt < max_retries:
+                        # urllib3 only honours Retry-After for these statuses
+                        if response.status_code in Retry.RETRY_AFTER_STATUS_CODES:
+                            retry_after = response.headers.get('Retry-After')
+                    else:
+                        response.raise_for_status()
+                        log_response(job_post_id, response.status_code, body_head,
+                                     ctx.max_log_bytes)
+                        return
+            except httpx.HTTPStatusError as e:
+                log_http_error(job_post_id, e.response.status_code, e)
+                return
+            except httpx.HTTPError as e:
+                if attempt == max_retries:
+                    log_request_failure(job_post_id, e)
+                    return
+            await asyncio.sleep(retry_delay(attempt, retry_after))
+
+def check_future(future: Union[concurrent.futures.Future, asyncio.Future],
+                 job_post_id: str) -> None:
+    try:
+        future.result()
+    except Exception as e:
+        log_unexpected_error(job_post_id, e)
+
+def make_executor(max_workers: int) -> concurrent.futures.Executor:
+    # Sending job posts is I/O-bound: workers spend almost all their time
+    # waiting on the network with the GIL released. Do not switch this to a
+    # ProcessPoolExecutor - each process costs a full interpreter's memory and
+    # every task would be pickled across, with no throughput gain. If the
+    # API's rate limit is the bottleneck, lower --concurrency instead.
+    return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+def send_requests_threaded(ctx: RequestContext, batches: Iterable[Dict[str, str]],
+                           concurrency: int, max_inflight: int) -> None:
+    # Submit through a bounded window of max_inflight futures rather than
+    # holding one future per job post
+    with make_executor(concurrency) as executor:
+        inflight: Dict[concurrent.futures.Future, str] = {}
+
+        for job_posts in batches:
+            for job_post_id, job_url in job_posts.items():
+                if len(inflight) >= max_inflight:
+                    done, _ = concurrent.futures.wait(
+                        inflight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        check_future(future, inflight.pop(future))
+
+                future = executor.submit(make_curl_request, ctx, job_post_id, job_url)
+                inflight[future] = job_post_id
+
+        for future in concurrent.futures.as_completed(inflight):
+            check_future(future, inflight[future])
+
+async def send_requests_async(ctx: RequestContext, batches: Iterable[Dict[str, str]],
+                              concurrency: int, max_inflight: int) -> None:
+    sem = asyncio.Semaphore(concurrency)
+    # Over HTTP/2 concurrent requests are multiplexed as streams on a single
+    # connection; the connection limit only matters if the server falls back
+    # to HTTP/1.1. httpx defaults to a 5 second timeout, which is too short
+    # for the API, so allow slow responses. Redirects are followed, as
+    # requests does on the thread pool path.
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+            http2=True, limits=limits, timeout=httpx.Timeout(300.0),
+            follow_redirects=True,
+            headers={'Content-Type': 'application/json'}) as client:
+        # Like the thread pool path, only max_inflight tasks exist at once
+        inflight: Dict[asyncio.Task, str] = {}
+
+        try:
+            for job_posts in batches:
+                for job_post_id, job_url in job_posts.items():
+                    if len(inflight) >= max_inflight:
+                        done, _ = await asyncio.wait(
+                            inflight, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            check_future(task, inflight.pop(task))
+
+                    task = asyncio.create_task(
+                        post_one(client, sem, ctx, job_post_id, job_url))
+                    inflight[task] = job_post_id
+        finally:
+            # Finish queued requests even if reading the CSV fails, as the
+            # thread pool does when its executor shuts down
+            if inflight:
+                done, _ = await asyncio.wait(inflight)
+                for task in done:
+                    check_future(task, inflight[task])
 
 # =============================================================================
 # Argument Parsing
 # =============================================================================
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return number
+
 def parse_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='Send job post requests.')
     parser.add_argument('-c', '--category',
@@ -103,18 +386,28 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument('-f', '--csv-file',
                         default=config.CSV_FILE_PATH,
                         help=f'Path to the CSV file (default: {config.CSV_FILE_PATH})')
+    parser.add_argument('--concurrency', type=positive_int,
+                        default=default_concurrency,
+                        help=f'Maximum number of concurrent requests (default: {default_concurrency})')
+    parser.add_argument('--max-inflight', type=positive_int,
+                        help='Maximum number of requests queued at once (default: 4 x --concurrency)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Validate the CSV file and report counts without sending requests')
+    parser.add_argument('--executor', choices=['thread', 'async'],
+                        default='async',
+                        help='Send requests from asyncio or a thread pool (default: async)')
+    parser.add_argument('--sync', dest='executor', action='store_const',
+                        const='thread', default=argparse.SUPPRESS,
+                        help='Same as --executor thread')
     return parser.parse_args()
 
 # =============================================================================
 # Main Processing Function
 # =============================================================================
-def process_csv_rows(args: argparse.Namespace) -> None:
-    logging.info("Starting job post requests processing")
-    secret_key = args.secret_key or os.environ.get('SECRET_KEY')
+def build_request_context(args: argparse.Namespace) -> RequestContext:
+    secret_key = args.secret_key or secret_key_from_env
     if not secret_key:
-        log_message = "SECRET_KEY environment variable or --secret-key argument is not provided"
-        log_with_hr(logging.error, log_message)
-        print(f"ERROR - {log_message}\n{hr}")
+        logging.error("SECRET_KEY environment variable or --secret-key argument is not provided")
         exit(1)
 
     # Log which SECRET_KEY is being used
@@ -123,56 +416,64 @@ def process_csv_rows(args: argparse.Namespace) -> None:
     else:
         logging.info("Using SECRET_KEY from environment variable")
 
+    return RequestContext(
+        url=url,
+        auth=f'Basic {encode_base64(secret_key + ":")}',
+        payload_tpl={"category": args.category, "country": args.country},
+        max_log_bytes=max_response_body_length)
+
+def process_csv_rows(args: argparse.Namespace) -> None:
+    logging.info("Starting job post requests processing")
+    # A dry run only checks the CSV file, so it has no request context and
+    # needs no SECRET_KEY
+    ctx: Optional[RequestContext] = None
+    if args.dry_run:
+        logging.info("Dry run: validating the CSV file without sending requests")
+    else:
+        ctx = build_request_context(args)
+    max_inflight = args.max_inflight
+    if max_inflight is None:
+        max_inflight = args.concurrency * 4
+
     try:
         start_time = time.time()
-        total_posts = 0
-        with open(args.csv_file, mode='r', newline='', encoding='utf-8-sig') as file:
-            reader = csv.DictReader(file)
+        stats: Counter = Counter()
+        with open_csv(args.csv_file) as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
 
-            if 'jobPostId' not in reader.fieldnames or 'url' not in reader.fieldnames:
+            if 'jobPostId' not in header or 'url' not in header:
                 raise ValueError("CSV does not contain required headers: 'jobPostId' and 'url'")
 
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                futures = []
-                job_posts_processed = set()
-
-                for row in reader:
-                    job_post_id = row['jobPostId']
-                    job_url = row['url']
-                    total_posts += 1
-
-                    if job_post_id not in job_posts_processed:
-                        futures.append(
-                            executor.submit(make_curl_request, job_post_id,
-                                            job_url, args.category,
-                                            args.country, secret_key))
-                        job_posts_processed.add(job_post_id)
-
-                for future in concurrent.futures.as_completed(futures):
-                    try:
-                        future.result()
-                    except Exception as e:
-                        log_message = f"Exception occurred for job post ID: {job_post_id}. Error: {e}"
-                        log_with_hr(logging.error, log_message)
-                        print(f"ERROR - {log_message}\n{hr}")
+            batches = iter_job_post_batches(reader, header.index('jobPostId'),
+                                            header.index('url'), stats)
+            if ctx is None:
+                for _ in batches:
+                    pass
+                logging.info("Dry run: %d rows, %d unique job posts, %d empty job post IDs, "
+                             "%d empty urls, %d malformed rows skipped",
+                             stats['rows'], stats['unique'], stats['empty_ids'],
+                             stats['empty_urls'], stats['malformed'])
+            elif args.executor == 'thread':
+                configure_session(args.concurrency)
+                send_requests_threaded(ctx, batches, args.concurrency, max_inflight)
+            else:
+                asyncio.run(send_requests_async(ctx, batches, args.concurrency,
+                                                max_inflight))
 
         duration = time.time() - start_time
-        log_message = f"Total operation duration: {duration:.2f} seconds. Total job posts processed: {total_posts}"
-        log_with_hr(logging.info, log_message)
-        print(f"{log_message}\n{hr}")
+        if ctx is None:
+            logging.info("Dry run duration: %.2f seconds. No requests were sent", duration)
+        else:
+            logging.info("Total operation duration: %.2f seconds. Total job posts processed: %d",
+                         duration, stats['rows'])
 
     except FileNotFoundError:
-        log_message = "CSV file not found. Please check the file path and try again."
-        log_with_hr(logging.error, log_message)
-        print(f"ERROR - {log_message}\n{hr}")
+        logging.error("CSV file not found. Please check the file path and try again.")
     except ValueError as e:
-        log_message = f"Value error: {e}"
-        log_with_hr(logging.error, log_message)
-        print(f"ERROR - {log_message}\n{hr}")
+        logging.error("Value error: %s", e)
     except Exception as e:
-        log_message = f"An error occurred: {e}"
-        log_with_hr(logging.error, log_message)
-        print(f"ERROR - {log_message}\n{hr}")
+        logging.error("An error occurred: %s", e)
 
     logging.info("Completed job post requests processing")
 